@@ -0,0 +1 @@
+# Корневой conftest: pytest добавляет корень репозитория в sys.path, и тесты импортируют pipeline
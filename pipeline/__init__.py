@@ -0,0 +1,29 @@
+"""
+Ядро обработки BOM-файлов: чтение Excel, запросы к Nexar, отправка в 1С.
+
+Пакет не тянет Flask и не настраивает логирование — это делают фронтенды
+(app.py, watcher.py). Тяжёлые зависимости (pandas, zeep) импортируются
+лениво, при первом использовании.
+"""
+from pipeline.excel import read_mpn_list, estimate_rows
+from pipeline.nexar import (
+    ALLOWED_SELLERS, create_client, process_part, match_all_mpn, build_output, process_all_mpn
+)
+from pipeline.onec import sanitize_for_1c, send_octopart_to_1c
+from pipeline.runner import process_file, process_file_async, process_rows
+
+__all__ = [
+    "ALLOWED_SELLERS",
+    "read_mpn_list",
+    "estimate_rows",
+    "create_client",
+    "process_part",
+    "match_all_mpn",
+    "build_output",
+    "process_all_mpn",
+    "sanitize_for_1c",
+    "send_octopart_to_1c",
+    "process_file",
+    "process_file_async",
+    "process_rows",
+]
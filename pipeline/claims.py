@@ -0,0 +1,180 @@
+import os
+import socket
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_FILE = ".heartbeat"
+
+
+def _unique_path(folder, name):
+    """Путь внутри folder, не затирающий уже лежащий там файл с тем же именем"""
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        return path
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f"{stem}.{int(time.time() * 1000)}{ext}")
+
+
+class FileClaims:
+    """
+    Координация нескольких watcher-узлов над одной папкой.
+
+    Файл захватывается атомарным переименованием в папку узла
+    (<root>/nodes/<node_id>/): переименование удаётся ровно у одного узла.
+    Узел раз в heartbeat_interval обновляет mtime своего .heartbeat; если
+    heartbeat старше lease_ttl, другие узлы забирают его файлы себе.
+    Опустевшая папка узла с истёкшей арендой удаляется; «медленный» узел
+    создаёт её заново при следующем heartbeat() или claim(), а о потере
+    файла узнаёт через lost().
+    root должен лежать на той же файловой системе, что и папка наблюдения.
+
+    node_id по умолчанию — имя хоста, чтобы после перезапуска recover()
+    подхватил файлы прошлого запуска. Несколько процессов на одном хосте
+    должны получить разные node_id (WATCHER_NODE_ID).
+    """
+
+    def __init__(self, root, node_id=None, lease_ttl=120, heartbeat_interval=15):
+        self.root = root
+        self.node_id = node_id or socket.gethostname()
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+
+        self.nodes_dir = os.path.join(root, "nodes")
+        self.node_dir = os.path.join(self.nodes_dir, self.node_id)
+        self.done_dir = os.path.join(root, "done")
+        self.failed_dir = os.path.join(root, "failed")
+        self.heartbeat_path = os.path.join(self.node_dir, HEARTBEAT_FILE)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Создаёт папки, пишет первый heartbeat и запускает поток продления аренды"""
+        for folder in (self.node_dir, self.done_dir, self.failed_dir):
+            os.makedirs(folder, exist_ok=True)
+        self.heartbeat()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"🔑 Узел {self.node_id} зарегистрирован в {self.root}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat_interval)
+
+        # Пустую папку узла убираем; с файлами оставляем — их заберут по истечении аренды
+        if not self._list_files(self.node_dir):
+            try:
+                os.remove(self.heartbeat_path)
+                os.rmdir(self.node_dir)
+            except OSError:
+                pass
+
+    def heartbeat(self):
+        os.makedirs(self.node_dir, exist_ok=True)
+        with open(self.heartbeat_path, "a"):
+            pass
+        os.utime(self.heartbeat_path, None)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"💥 Не удалось продлить аренду узла {self.node_id}: {e}")
+
+    @staticmethod
+    def _list_files(folder):
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(folder, name) for name in names
+            if not name.startswith(".") and os.path.isfile(os.path.join(folder, name))
+        )
+
+    def owns(self, filepath):
+        return os.path.dirname(os.path.abspath(filepath)) == os.path.abspath(self.node_dir)
+
+    def claim(self, filepath, name=None):
+        """
+        Пытается захватить файл (под именем name, если задано). Возвращает
+        новый путь в папке узла или None, если файл уже забрал другой узел.
+        """
+        if self.owns(filepath):
+            return filepath
+
+        # Вторая попытка — на случай, если другой узел удалил нашу папку как опустевшую
+        for attempt in range(2):
+            os.makedirs(self.node_dir, exist_ok=True)
+            target = _unique_path(self.node_dir, name or os.path.basename(filepath))
+            try:
+                os.rename(filepath, target)
+                return target
+            except FileNotFoundError:
+                if not os.path.exists(filepath):
+                    return None
+                if attempt:
+                    raise
+
+    def lost(self, claimed_path):
+        """True, если захваченный файл забрал другой узел (аренда истекла)"""
+        return not os.path.exists(claimed_path)
+
+    def release(self, claimed_path, success=True):
+        """Переносит обработанный файл в done/ или failed/"""
+        folder = self.done_dir if success else self.failed_dir
+        try:
+            os.rename(claimed_path, _unique_path(folder, os.path.basename(claimed_path)))
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Захваченный файл пропал до освобождения: {claimed_path}")
+
+    def recover(self):
+        """Файлы, оставшиеся в папке узла с прошлого запуска с тем же node_id"""
+        return self._list_files(self.node_dir)
+
+    def reclaim_expired(self):
+        """Забирает файлы узлов с истёкшей арендой. Возвращает захваченные пути."""
+        reclaimed = []
+        try:
+            node_ids = os.listdir(self.nodes_dir)
+        except FileNotFoundError:
+            return reclaimed
+
+        now = time.time()
+        for node_id in node_ids:
+            if node_id == self.node_id:
+                continue
+
+            node_dir = os.path.join(self.nodes_dir, node_id)
+            try:
+                last_beat = os.path.getmtime(os.path.join(node_dir, HEARTBEAT_FILE))
+            except OSError:
+                last_beat = 0
+            if now - last_beat <= self.lease_ttl:
+                continue
+
+            for filepath in self._list_files(node_dir):
+                claimed = self.claim(filepath)
+                if claimed:
+                    logger.warning(f"♻️ Забран файл узла {node_id}: {os.path.basename(filepath)}")
+                    reclaimed.append(claimed)
+
+            # Опустевшую папку убираем, чтобы папки упавших узлов не копились
+            if not self._list_files(node_dir):
+                try:
+                    os.remove(os.path.join(node_dir, HEARTBEAT_FILE))
+                except OSError:
+                    pass
+                try:
+                    os.rmdir(node_dir)
+                except OSError:
+                    pass
+
+        return reclaimed
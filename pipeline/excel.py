@@ -0,0 +1,39 @@
+def read_mpn_list(filepath):
+    """
+    Читает входной Excel: первая колонка — MPN, вторая — количество.
+    pandas импортируется только здесь, чтобы не замедлять старт воркера.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(filepath, header=None, engine='openpyxl')
+
+    mpn_list = []
+    for _, row in df.iterrows():
+        mpn_list.append({
+            "mpn": str(row[0]).strip(),
+            "quantity": int(row[1]) if len(row) > 1 else 1
+        })
+
+    return mpn_list
+
+
+def estimate_rows(filepath):
+    """
+    Быстрая оценка числа строк без чтения всей книги: берём размерность листа
+    из заголовка XLSX. Возвращает None, если оценить не удалось (например, .xls).
+    """
+    try:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(filepath, read_only=True)
+        try:
+            ws = wb.worksheets[0]
+            rows = ws.max_row
+            if rows is None:
+                # Размерность не записана — считаем строки потоково
+                rows = sum(1 for _ in ws.iter_rows(values_only=True))
+            return rows
+        finally:
+            wb.close()
+    except Exception:
+        return None
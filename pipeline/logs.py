@@ -0,0 +1,101 @@
+import os
+import queue
+import atexit
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = (
+    "%(asctime)s %(levelname)s %(name)s "
+    "job=%(job_id)s file=%(job_file)s phase=%(phase)s - %(message)s"
+)
+
+# Уровни по умолчанию для шумных библиотек: zeep на DEBUG пишет весь XML
+DEFAULT_MODULE_LEVELS = {
+    "zeep": logging.WARNING,
+    "urllib3": logging.INFO,
+    "watchdog": logging.INFO,
+}
+
+_job_context = contextvars.ContextVar("job_context", default={})
+_listener = None
+
+
+class JobContextFilter(logging.Filter):
+    """Добавляет к записи поля текущего задания: job_id, job_file, phase"""
+
+    def filter(self, record):
+        ctx = _job_context.get()
+        record.job_id = ctx.get("job_id", "-")
+        record.job_file = ctx.get("job_file", "-")
+        record.phase = ctx.get("phase", "-")
+        return True
+
+
+@contextmanager
+def job_context(**fields):
+    """Поля задания для всех записей лога внутри блока; вложенные блоки дополняют внешние"""
+    token = _job_context.set({**_job_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _job_context.reset(token)
+
+
+def truncate(value, limit=None):
+    """Обрезает длинное значение для лога, сохраняя исходную длину в подписи"""
+    if limit is None:
+        # Максимальная длина больших данных (ответы SOAP и т.п.) в логе
+        limit = int(os.getenv("LOG_PAYLOAD_LIMIT", 500))
+    text = str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text)} символов]"
+
+
+def _parse_module_levels(spec):
+    """LOG_LEVELS='pipeline.nexar=WARNING,zeep=ERROR' -> {'pipeline.nexar': 30, 'zeep': 40}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(value, int):
+            levels[name.strip()] = value
+    return levels
+
+
+def setup_logging(level=logging.INFO, logfile=None, max_bytes=10 * 1024 * 1024, backup_count=5):
+    """
+    Настраивает корневой логгер: записи кладутся в очередь, а форматирование
+    и запись на диск/в консоль выполняет фоновый QueueListener.
+    Повторный вызов ничего не делает.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if logfile:
+        handlers.append(RotatingFileHandler(
+            logfile, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(JobContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    module_levels = {**DEFAULT_MODULE_LEVELS, **_parse_module_levels(os.getenv("LOG_LEVELS"))}
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,395 @@
+import os
+import asyncio
+import logging
+import threading
+
+from pipeline.warm import open_store
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_SELLERS = [
+    "Mouser", "Digi-Key", "Arrow", "TTI", "ADI",
+    "Coilcraft", "Rochester", "Verical", "Texas Instruments", "MINICIRCUITS"
+]
+
+SEARCH_QUERY = '''
+    query Search ($q: String!, $limit: Int!) {
+      supSearch(q: $q, limit: $limit, currency: "USD") {
+        results {
+          part { 
+            mpn
+            name
+            manufacturer { name }
+          }
+        }
+      }
+    }
+'''
+
+MULTI_MATCH_QUERY = '''
+        query csvDemo($queries: [SupPartMatchQuery!]!) {
+          supMultiMatch(currency: "USD", queries: $queries) {
+            parts {
+              mpn
+              name
+              category { id name }
+              images { url }
+              descriptions { text }
+              manufacturer { id name }
+              sellers {
+                company { id name isVerified homepageUrl }
+                offers {
+                  inventoryLevel
+                  prices { quantity currency convertedPrice convertedCurrency }
+                }
+              }
+            }
+          }
+        }
+'''
+
+
+class LazyNexarClient:
+    """
+    NexarClient, создаваемый при первом запросе: токен не запрашивается,
+    если всё нашлось в кеше. Один экземпляр переиспользуется всеми срезами задания.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get_query(self, query, variables):
+        with self._lock:
+            if self._client is None:
+                from nexarClient import NexarClient
+
+                clientId = os.getenv("NEXAR_ID")
+                clientSecret = os.getenv("NEXAR_TOKEN")
+                self._client = NexarClient(clientId, clientSecret)
+        return self._client.get_query(query, variables)
+
+
+def create_client():
+    return LazyNexarClient()
+
+
+def max_variants():
+    """
+    Сколько вариаций supSearch брать на один MPN (NEXAR_MAX_VARIANTS).
+    По умолчанию 0: supSearch не вызывается, ищется только сам MPN — так
+    выгрузка для 1С совпадает с прежней. Каждая вариация — отдельная позиция
+    в supMultiMatch и отдельные строки в 1С, включать только по согласованию с 1С.
+    """
+    return int(os.getenv("NEXAR_MAX_VARIANTS", 0))
+
+
+async def fetch_variants(nexar, mpn, max_retries=3):
+    """
+    Вариации MPN через supSearch, не больше max_variants().
+    Возвращает список MPN (возможно пустой) или None, если Nexar не ответил.
+    При выключенных вариациях возвращает [mpn] без запроса к Nexar.
+    """
+    limit = max_variants()
+    if limit <= 0:
+        return [mpn]
+    variables = {"q": mpn, "limit": limit}
+
+    for attempt in range(1, max_retries + 1):
+        try:
+            # to_thread копирует contextvars: поля job_context видны в логах потока
+            result = await asyncio.to_thread(nexar.get_query, SEARCH_QUERY, variables) or {}
+            break
+        except Exception as e:
+            wait = 2 ** (attempt - 1)
+            logger.warning(
+                f"Partial-запрос Nexar ошибка ({mpn}, попытка {attempt}/{max_retries}): {e}. Жду {wait}s."
+            )
+            await asyncio.sleep(wait)
+    else:
+        return None
+
+    variants = []
+    for item in (result.get("supSearch") or {}).get("results") or []:
+        part = item.get("part")
+        if part and part.get("mpn") and part["mpn"] not in variants:
+            variants.append(part["mpn"])
+
+            #for similar in part.get("similarParts", []):
+                #if similar.get("mpn"):
+                    #variants.append(similar["mpn"])
+
+    return variants[:limit]
+
+
+async def fetch_parts(nexar, mpns, max_retries=3):
+    """
+    Детальные данные по списку MPN через один запрос supMultiMatch.
+    Возвращает список part или None, если Nexar не ответил.
+    """
+    variables = {"queries": [{"mpn": mpn} for mpn in mpns]}
+
+    # retry
+    for attempt in range(1, max_retries + 1):
+        try:
+            response = nexar.get_query(MULTI_MATCH_QUERY, variables) or {}
+            break
+        except Exception as e:
+            wait = 2 ** (attempt - 1)
+            logger.warning(
+                f"Nexar API ошибка (попытка {attempt}/{max_retries}): {e}. Жду {wait}s."
+            )
+            await asyncio.sleep(wait)
+    else:
+        return None
+
+    multi_res = response.get("supMultiMatch") or []
+    if isinstance(multi_res, dict):
+        multi_res = [multi_res]
+
+    parts = []
+    for block in multi_res:
+        for part in block.get("parts") or []:
+            if part.get("mpn"):
+                parts.append(part)
+    return parts
+
+
+def process_part(part, original_mpn, found_mpn, ALLOWED_SELLERS, requested_quantity=None):
+    """
+    Универсальная обработка результата одного part
+    Возвращает список записей (часто 1+, если несколько цен).
+    """
+
+    output_records = []
+
+    # === Безопасное извлечение данных ===
+    original_mpn = original_mpn or ""
+    part_name = part.get("name") or ""
+    manufacturer_node = part.get("manufacturer") or {}
+    category_node = part.get("category") or {}
+    images = part.get("images") or []
+    descriptions = part.get("descriptions") or []
+    sellers = part.get("sellers") or []
+
+    # manufacturer
+    if isinstance(manufacturer_node, dict):
+        manufacturer_id = manufacturer_node.get("id")
+        manufacturer_name = manufacturer_node.get("name")
+    else:
+        manufacturer_id = None
+        manufacturer_name = str(manufacturer_node)
+
+    # category
+    category_id = category_node.get("id")
+    category_name = category_node.get("name")
+
+    # image URL (берём первую)
+    image_url = images[0]["url"] if images and isinstance(images[0], dict) else None
+
+    # description (тоже первую)
+    description = descriptions[0]["text"] if descriptions and isinstance(descriptions[0], dict) else None
+
+
+    # === Проходим всех продавцов ===
+    for seller in sellers:
+        company = seller.get("company") or {}
+        seller_name = company.get("name")
+        seller_id = company.get("id")
+        seller_verified = company.get("isVerified")
+        seller_homepageUrl = company.get("homepageUrl")
+
+        if not seller_name:
+            continue
+
+        if ALLOWED_SELLERS and seller_name not in ALLOWED_SELLERS:
+            continue
+
+        offers = seller.get("offers") or []
+
+        # === Проходим офферы ===
+        for offer in offers:
+            stock = offer.get("inventoryLevel")
+            prices = offer.get("prices") or []
+
+            # цены внутри оффера
+            for price in prices:
+                base_price = price.get("convertedPrice")
+                currency = price.get("convertedCurrency") or price.get("currency")
+                offer_quantity = price.get("quantity")
+
+                # защита от кривых данных
+                try:
+                    base_price = float(base_price)
+                except:
+                    base_price = None
+
+                # Ценообразование
+                delivery_coef = 1.27
+                markup = 1.18
+
+                if base_price:
+                    target_price_purchasing = base_price * 0.82
+                    cost_with_delivery = target_price_purchasing + delivery_coef
+                    target_price_sales = target_price_purchasing + delivery_coef + markup
+                else:
+                    target_price_purchasing = None
+                    cost_with_delivery = None
+                    target_price_sales = None
+
+                output_records.append({
+                    "requested_mpn": original_mpn,
+                    "mpn": found_mpn,
+                    "manufacturer": manufacturer_name,
+                    "manufacturer_id": manufacturer_id,
+                    "manufacturer_name": manufacturer_name,
+
+                    "seller_id": seller_id,
+                    "seller_name": seller_name,
+                    "seller_verified": seller_verified,
+                    "seller_homepageUrl": seller_homepageUrl,
+
+                    "stock": stock,
+                    "offer_quantity": offer_quantity,
+                    "price": base_price,
+                    "currency": currency,
+
+                    "category_id": category_id,
+                    "category_name": category_name,
+                    "image_url": image_url,
+                    "description": description,
+
+                    "requested_quantity": requested_quantity,
+                    "status": "Найдено",
+
+                    "delivery_coef": delivery_coef,
+                    "markup": markup,
+                    "target_price_purchasing": round(target_price_purchasing, 2) if target_price_purchasing else None,
+                    "cost_with_delivery": round(cost_with_delivery, 2) if cost_with_delivery else None,
+                    "target_price_sales": round(target_price_sales, 2) if target_price_sales else None
+                })
+
+    return output_records
+
+
+async def match_all_mpn(mpn_list, nexar=None, chunk_size=15, max_retries=3):
+    """
+    Сбор данных Nexar по списку MPN без формирования строк:
+    1. Получаем все вариации через supSearch.
+    2. Получаем детальную информацию через supMultiMatch.
+    Перед запросами к Nexar проверяется прогретый кеш (pipeline.warm).
+    Возвращает (requests, parts): {запрошенный MPN: {"variants", "quantity"}}
+    и {найденный MPN: part}. Результаты нескольких срезов одного файла можно
+    объединить через dict.update и передать в build_output.
+    """
+    nexar = nexar or create_client()
+
+    store = open_store()
+    if store:
+        store.record_requests([item["mpn"] for item in mpn_list])
+
+    try:
+        # --- 1. Получение всех вариаций через supSearch ---
+        expand = max_variants() > 0
+
+        async def partial_request_variations(mpn_item):
+            mpn = mpn_item["mpn"]
+            if not expand:
+                return [mpn]
+            if store:
+                cached = store.get_variants(mpn)
+                if cached is not None:
+                    return cached or [mpn]
+
+            variants = await fetch_variants(nexar, mpn, max_retries)
+            return variants or [mpn]
+
+        # запускаем partial для всех MPN
+        partial_tasks = [partial_request_variations(item) for item in mpn_list]
+        all_variants_lists = await asyncio.gather(*partial_tasks)
+
+        requests = {
+            item["mpn"]: {
+                "variants": variants,
+                "quantity": item.get("quantity"),
+            }
+            for item, variants in zip(mpn_list, all_variants_lists)
+        }
+        parts = {}
+
+        # --- 2. Получение данных через supMultiMatch ---
+        multi_mpn_list = [v for sublist in all_variants_lists for v in sublist]
+
+        if store:
+            warm_parts = store.get_parts(multi_mpn_list)
+            for part in warm_parts.values():
+                if part:
+                    parts[part["mpn"]] = part
+            multi_mpn_list = [mpn for mpn in multi_mpn_list if mpn not in warm_parts]
+            if warm_parts:
+                logger.info(f"Прогретый кеш: {len(warm_parts)} MPN без запроса к Nexar")
+
+        for i in range(0, len(multi_mpn_list), chunk_size):
+            chunk = multi_mpn_list[i:i + chunk_size]
+
+            found = await fetch_parts(nexar, chunk, max_retries)
+            if found is None:
+                logger.error(f"Nexar API не ответил после {max_retries} попыток для чанка {i // chunk_size + 1}")
+                continue
+
+            for part in found:
+                parts[part["mpn"]] = part
+    finally:
+        if store:
+            store.close()
+
+    return requests, parts
+
+
+def build_output(requests, parts):
+    """Распределяет найденные part по запрошенным MPN и формирует плоский список для 1С"""
+    mapping = {
+        requested_mpn: {**data, "results": {}}
+        for requested_mpn, data in requests.items()
+    }
+
+    for found_mpn, part in parts.items():
+        # распределяем результаты по mapping
+        for req_mpn, data in mapping.items():
+            if found_mpn in data["variants"]:
+                data["results"][found_mpn] = part
+                break
+
+    flat_output = []
+
+    for requested_mpn, data in mapping.items():
+        qty = data.get("quantity")
+        results = data.get("results") or {}
+
+        if not results:
+            flat_output.append({
+                "requested_mpn": requested_mpn,
+                "status": "Не найдено"
+            })
+            continue
+
+        for found_mpn, part in results.items():
+            rows = process_part(
+                part=part,
+                original_mpn=requested_mpn,
+                found_mpn=found_mpn,
+                ALLOWED_SELLERS=ALLOWED_SELLERS,
+                requested_quantity=qty
+            )
+            flat_output.extend(rows)
+
+    return flat_output
+
+
+async def process_all_mpn(mpn_list, mode="xlsx", chunk_size=15, max_retries=3, nexar=None):
+    """
+    Асинхронная обработка списка MPN: данные Nexar (match_all_mpn)
+    и формирование плоского списка записей (build_output).
+    """
+    requests, parts = await match_all_mpn(mpn_list, nexar, chunk_size, max_retries)
+    return build_output(requests, parts)
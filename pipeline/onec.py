@@ -0,0 +1,69 @@
+import os
+import json
+import logging
+
+from pipeline.logs import truncate
+
+logger = logging.getLogger(__name__)
+
+# SOAP-клиент 1С создаётся один раз: разбор WSDL дорогой
+_client = None
+_client_key = None
+
+
+def sanitize_for_1c(obj):
+    """
+    Рекурсивно заменяет все None на пустые строки для корректной отправки в 1С
+    """
+    if isinstance(obj, dict):
+        return {k: sanitize_for_1c(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [sanitize_for_1c(v) for v in obj]
+    elif obj is None:
+        return ""
+    else:
+        return obj
+
+
+def _get_client(wsdl_url, username, password):
+    """Возвращает закешированный zeep-клиент, импортируя zeep при первом вызове"""
+    global _client, _client_key
+
+    key = (wsdl_url, username, password)
+    if _client is not None and _client_key == key:
+        return _client
+
+    import requests
+    from requests.auth import HTTPBasicAuth
+    from zeep import Client, Settings
+    from zeep.transports import Transport
+
+    session = requests.Session()
+    session.auth = HTTPBasicAuth(username, password)
+    transport = Transport(session=session)
+    settings = Settings(strict=False, xml_huge_tree=True)
+
+    _client = Client(wsdl=wsdl_url, transport=transport, settings=settings)
+    _client_key = key
+    return _client
+
+
+def send_octopart_to_1c(data):
+
+    wsdl_url = os.getenv("URL_1C")
+    username = os.getenv("USER_1C")
+    password = os.getenv("PASSWORD_1C")
+
+    if not wsdl_url or not username or not password:
+        logger.error("❌ Не заданы параметры подключения к 1С")
+        return
+
+    sanitized_data = sanitize_for_1c(data)
+    json_str = json.dumps(sanitized_data, ensure_ascii=False)
+
+    try:
+        client = _get_client(wsdl_url, username, password)
+        response = client.service.ReturnOctopartData(json_str)
+        logger.info(f"[1C SOAP] Данные успешно отправлены. Ответ: {truncate(response)}")
+    except Exception as e:
+        logger.error(f"[1C SOAP] Ошибка отправки данных в 1С: {str(e)}")
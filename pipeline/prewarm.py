@@ -0,0 +1,137 @@
+"""
+Ночной прогрев кеша Nexar для часто запрашиваемых MPN.
+
+Запуск разово: python -m pipeline.prewarm
+В watcher прогрев включается переменной PREWARM_ENABLED=1.
+
+Кеш WARM_STORE локален для хоста (SQLite в режиме WAL нельзя делить по сети):
+прогретые данные видят только процессы этого хоста с тем же путём WARM_STORE.
+Прогрев включают на одном процессе каждого хоста с watcher-узлами.
+"""
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+
+from pipeline.nexar import create_client, fetch_variants, fetch_parts, max_variants
+from pipeline.warm import open_store
+
+logger = logging.getLogger(__name__)
+
+
+def load_configured_mpns(path):
+    """MPN из файла PREWARM_MPN_FILE (по одному в строке) — прогреваются первыми"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def in_quiet_hours(now=None, hours=None):
+    """Тихие часы PREWARM_HOURS по локальному времени, "начало-конец" (конец не включается)"""
+    hours = hours or os.getenv("PREWARM_HOURS", "1-6")
+    start, _, end = hours.partition("-")
+    start, end = int(start), int(end)
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    # Окно через полночь, например 22-5
+    return hour >= start or hour < end
+
+
+async def prewarm_async(store, budget=None, top=None, chunk_size=15, max_retries=3):
+    """
+    Прогревает кеш в порядке убывания частоты запросов, пока не исчерпан бюджет
+    запросов к Nexar (PREWARM_BUDGET). Берутся PREWARM_TOP самых частых MPN из истории.
+    Обновляются и записи, которые истекут в ближайшие PREWARM_LOOKAHEAD_HOURS часов:
+    иначе данные вчерашнего прогрева протухают утром и весь рабочий день MPN холодный.
+    Возвращает число потраченных запросов.
+    """
+    budget = budget or int(os.getenv("PREWARM_BUDGET", 500))
+    top = top or int(os.getenv("PREWARM_TOP", 3000))
+    lookahead = float(os.getenv("PREWARM_LOOKAHEAD_HOURS", 20)) * 3600
+
+    configured = load_configured_mpns(os.getenv("PREWARM_MPN_FILE"))
+    mpns = list(dict.fromkeys(configured + store.top_requested(top)))
+    nexar = None
+    spent = 0
+    pending = []
+    seen = set()
+
+    async def flush(chunk):
+        nonlocal spent
+        spent += 1
+        parts = await fetch_parts(nexar, chunk, max_retries)
+        if parts is not None:
+            store.put_parts(chunk, parts)
+
+    expand = max_variants() > 0
+
+    for mpn in mpns:
+        if spent >= budget:
+            break
+
+        variants = store.get_variants(mpn, fresh_for=lookahead) if expand else [mpn]
+        if variants is None:
+            nexar = nexar or create_client()
+            spent += 1
+            variants = await fetch_variants(nexar, mpn, max_retries)
+            if variants is None:
+                continue
+            store.put_variants(mpn, variants)
+
+        warm = store.get_parts(variants or [mpn], fresh_for=lookahead)
+        for variant in variants or [mpn]:
+            if variant not in warm and variant not in seen:
+                seen.add(variant)
+                pending.append(variant)
+
+        while len(pending) >= chunk_size and spent < budget:
+            nexar = nexar or create_client()
+            await flush(pending[:chunk_size])
+            pending = pending[chunk_size:]
+
+    if pending and spent < budget:
+        nexar = nexar or create_client()
+        await flush(pending)
+
+    return spent
+
+
+def prewarm(**kwargs):
+    store = open_store()
+    if store is None:
+        logger.warning("Прогрев пропущен: кеш отключён (WARM_STORE)")
+        return 0
+
+    started = time.time()
+    try:
+        spent = asyncio.run(prewarm_async(store, **kwargs))
+    finally:
+        store.close()
+    logger.info(f"🔥 Прогрев кеша завершён: {spent} запросов к Nexar за {time.time() - started:.0f}s")
+    return spent
+
+
+def prewarm_loop(stop_event, check_interval=300):
+    """Фоновый цикл: прогрев раз в сутки в тихие часы, до установки stop_event"""
+    last_run = None
+    while not stop_event.wait(check_interval):
+        today = datetime.now().date()
+        if last_run == today or not in_quiet_hours():
+            continue
+        try:
+            prewarm()
+        except Exception as e:
+            logger.error(f"💥 Ошибка прогрева кеша: {e}")
+        last_run = today
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pipeline.logs import setup_logging
+
+    load_dotenv()
+    setup_logging()
+    prewarm()
@@ -0,0 +1,27 @@
+import asyncio
+
+from pipeline.excel import read_mpn_list
+from pipeline.nexar import process_all_mpn, match_all_mpn
+from pipeline.onec import send_octopart_to_1c
+
+
+async def process_file_async(filepath):
+    mpn_list = read_mpn_list(filepath)
+
+    flat_json = await process_all_mpn(mpn_list)
+
+    send_octopart_to_1c(flat_json)
+
+    return flat_json
+
+
+def process_file(filepath):
+    return asyncio.run(process_file_async(filepath))
+
+
+def process_rows(mpn_list, nexar=None):
+    """
+    Собирает данные Nexar по части BOM без отправки в 1С — для поэтапной обработки
+    больших файлов. Возвращает (requests, parts) для накопления и build_output.
+    """
+    return asyncio.run(match_all_mpn(mpn_list, nexar))
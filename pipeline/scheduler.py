@@ -0,0 +1,174 @@
+import os
+import re
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+from pipeline.excel import estimate_rows
+
+PRIORITY_URGENT = "urgent"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+
+# Срочные задания — отдельный первый ярус: идут в порядке поступления раньше всех остальных
+PRIORITY_TIERS = {
+    PRIORITY_URGENT: 0,
+    PRIORITY_NORMAL: 1,
+    PRIORITY_LOW: 1,
+}
+
+# Множитель стоимости внутри яруса: низкий приоритет — «дороже»
+PRIORITY_WEIGHTS = {
+    PRIORITY_URGENT: 0.0,
+    PRIORITY_NORMAL: 1.0,
+    PRIORITY_LOW: 4.0,
+}
+
+# Слова в имени файла, делающие его срочным
+URGENT_WORDS = ("urgent", "срочно")
+# Явная метка в конце имени: bom__urgent.xlsx, bom__low.xlsx
+PRIORITY_MARKERS = {
+    PRIORITY_URGENT: "__urgent",
+    PRIORITY_LOW: "__low",
+}
+
+# Стоимость файла, размер которого оценить не удалось
+DEFAULT_ROWS = 1000
+
+
+def parse_priority(filepath):
+    """
+    Приоритет по подпапке (urgent/, low/), метке в конце имени (__urgent, __low)
+    или словам urgent/срочно в имени; иначе normal.
+    """
+    stem = os.path.splitext(os.path.basename(filepath))[0].lower()
+    folder = os.path.basename(os.path.dirname(filepath)).lower()
+
+    for priority, marker in PRIORITY_MARKERS.items():
+        if folder == priority or stem.endswith(marker):
+            return priority
+    if set(re.split(r"[\W_]+", stem)).intersection(URGENT_WORDS):
+        return PRIORITY_URGENT
+    return PRIORITY_NORMAL
+
+
+def priority_filename(filepath, priority):
+    """
+    Имя файла с меткой приоритета. Захваченный файл лежит в папке узла, и
+    приоритет подпапки иначе потерялся бы при восстановлении или перехвате.
+    """
+    name = os.path.basename(filepath)
+    marker = PRIORITY_MARKERS.get(priority)
+    stem, ext = os.path.splitext(name)
+    if not marker or stem.lower().endswith(marker):
+        return name
+    return f"{stem}{marker}{ext}"
+
+
+class Job:
+    """
+    Один BOM-файл в очереди. Большие файлы обрабатываются срезами:
+    после каждого среза задание возвращается в очередь с остатком строк.
+    """
+
+    def __init__(self, path, rows=None, priority=PRIORITY_NORMAL):
+        self.id = uuid.uuid4().hex[:8]
+        self.path = path
+        self.rows = rows if rows is not None else DEFAULT_ROWS
+        self.priority = priority
+        self.enqueued_at = time.time()
+
+        self.claimed = None
+        self.mpn_list = None
+        self.offset = 0
+        # Накопленные по срезам данные Nexar; строки для 1С строятся один раз в конце
+        self.nexar = None
+        self.requests = {}
+        self.parts = {}
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(path, rows=estimate_rows(path), priority=parse_priority(path))
+
+    @property
+    def remaining_rows(self):
+        if self.mpn_list is None:
+            return self.rows
+        return len(self.mpn_list) - self.offset
+
+    @property
+    def done(self):
+        return self.mpn_list is not None and self.offset >= len(self.mpn_list)
+
+    def next_slice(self, size):
+        chunk = self.mpn_list[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+class JobScheduler:
+    """
+    Потокобезопасная очередь заданий: сначала дешёвые, со старением.
+
+    Ключ = (ярус, оставшиеся строки * вес приоритета + aging_rate * время постановки).
+    Срочные всегда впереди. Внутри яруса старение линейно и одинаково для всех,
+    поэтому порядок в куче не меняется со временем: задание, ждущее t секунд,
+    «дешевеет» на aging_rate * t строк относительно новых, и большие файлы не голодают.
+    После каждого среза requeue() оставляет заданию накопленное старение, но не
+    больше «стоимость остатка минус один срез»: остаток большого файла уступает
+    новым маленьким примерно slice_rows / aging_rate секунд и снова идёт дальше.
+    Так срезы чередуются с маленькими файлами, а накопленное ожидание большого
+    файла не сгорает целиком после каждого среза.
+    """
+
+    def __init__(self, aging_rate=20.0):
+        self.aging_rate = aging_rate
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _score(self, job):
+        tier = PRIORITY_TIERS.get(job.priority, 1)
+        return tier, self._cost(job) + self.aging_rate * job.enqueued_at
+
+    @staticmethod
+    def _cost(job):
+        return job.remaining_rows * PRIORITY_WEIGHTS.get(job.priority, 1.0)
+
+    def put(self, job):
+        with self._cond:
+            heapq.heappush(self._heap, (*self._score(job), next(self._counter), job))
+            self._cond.notify()
+
+    def requeue(self, job, slice_rows):
+        """Возвращает недообработанное задание в очередь, урезая накопленное старение"""
+        now = time.time()
+        if self.aging_rate > 0:
+            credit = self.aging_rate * (now - job.enqueued_at)
+            slice_cost = slice_rows * PRIORITY_WEIGHTS.get(job.priority, 1.0)
+            credit = max(0.0, min(credit, self._cost(job) - slice_cost))
+            job.enqueued_at = now - credit / self.aging_rate
+        else:
+            job.enqueued_at = now
+        self.put(job)
+
+    def get(self):
+        """Блокирует до появления задания; после close() возвращает None"""
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[-1]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def qsize(self):
+        with self._cond:
+            return len(self._heap)
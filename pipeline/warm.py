@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    mpn TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variants (
+    mpn TEXT PRIMARY KEY,
+    variants TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parts (
+    mpn TEXT PRIMARY KEY,
+    part TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def open_store(path=None):
+    """Открывает кеш; при ошибке или отключённом кеше возвращает None — обработка идёт без него"""
+    if path is None:
+        # Пустое значение WARM_STORE отключает кеш
+        path = os.getenv("WARM_STORE", "warm_store.db")
+    if not path:
+        return None
+    try:
+        return WarmStore(path)
+    except Exception as e:
+        logger.warning(f"Прогретый кеш недоступен ({path}): {e}")
+        return None
+
+
+class WarmStore:
+    """
+    Локальный SQLite-кеш ответов Nexar. Общий только для процессов одного хоста
+    с одинаковым путём WARM_STORE; на сетевой папке не размещать.
+
+    requests — сколько раз запрашивался каждый MPN (для ранжирования прогрева),
+    variants — результат supSearch, parts — результат supMultiMatch по MPN;
+    part = NULL означает, что Nexar ничего не нашёл.
+    """
+
+    def __init__(self, path, ttl_hours=None):
+        if ttl_hours is None:
+            # Сколько часов прогретые данные считаются свежими
+            ttl_hours = float(os.getenv("WARM_TTL_HOURS", 24))
+        self.ttl = ttl_hours * 3600
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _fresh_since(self, fresh_for=0):
+        """Нижняя граница fetched_at для записей, свежих ещё fresh_for секунд"""
+        return time.time() - self.ttl + fresh_for
+
+    def record_requests(self, mpns):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO requests (mpn, hits, last_seen) VALUES (?, 1, ?) "
+                "ON CONFLICT(mpn) DO UPDATE SET hits = hits + 1, last_seen = excluded.last_seen",
+                [(mpn, now) for mpn in mpns if mpn]
+            )
+
+    def top_requested(self, limit, max_age_days=30):
+        """Самые частые MPN, запрошенные за последние max_age_days дней"""
+        rows = self.conn.execute(
+            "SELECT mpn FROM requests WHERE last_seen >= ? ORDER BY hits DESC, last_seen DESC LIMIT ?",
+            (time.time() - max_age_days * 86400, limit)
+        )
+        return [row[0] for row in rows]
+
+    def get_variants(self, mpn, fresh_for=0):
+        """Свежий список вариаций или None, если в кеше его нет"""
+        row = self.conn.execute(
+            "SELECT variants FROM variants WHERE mpn = ? AND fetched_at >= ?",
+            (mpn, self._fresh_since(fresh_for))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_variants(self, mpn, variants):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO variants (mpn, variants, fetched_at) VALUES (?, ?, ?)",
+                (mpn, json.dumps(variants, ensure_ascii=False), time.time())
+            )
+
+    def get_parts(self, mpns, fresh_for=0):
+        """{mpn: part или None} только для MPN, которые есть в кеше и свежи ещё fresh_for секунд"""
+        found = {}
+        fresh_since = self._fresh_since(fresh_for)
+        unique = list(dict.fromkeys(mpns))
+        # Ограничение SQLite на число параметров в запросе
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT mpn, part FROM parts WHERE fetched_at >= ? AND mpn IN ({placeholders})",
+                (fresh_since, *chunk)
+            )
+            for mpn, part in rows:
+                found[mpn] = json.loads(part) if part else None
+        return found
+
+    def put_parts(self, mpns, parts):
+        """Сохраняет ответ supMultiMatch; запрошенные MPN без совпадений помечаются как ненайденные"""
+        now = time.time()
+        by_mpn = {part["mpn"]: part for part in parts}
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO parts (mpn, part, fetched_at) VALUES (?, ?, ?)",
+                [
+                    (mpn, json.dumps(part, ensure_ascii=False) if part else None, now)
+                    for mpn, part in {**{mpn: None for mpn in mpns}, **by_mpn}.items()
+                ]
+            )
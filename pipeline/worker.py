@@ -0,0 +1,62 @@
+import os
+import logging
+
+from pipeline.excel import read_mpn_list
+from pipeline.logs import job_context
+from pipeline.nexar import build_output, create_client
+from pipeline.onec import send_octopart_to_1c
+from pipeline.runner import process_rows
+from pipeline.scheduler import priority_filename
+
+logger = logging.getLogger(__name__)
+
+
+def process_job(job, claims, scheduler, slice_rows=500):
+    """Обрабатывает очередной срез задания; незавершённое задание возвращает в очередь"""
+    filename = os.path.basename(job.path)
+    try:
+        if job.claimed is None:
+            # Отсутствующий файл при нескольких узлах — обычное дело: его забрал другой узел
+            with job_context(phase="claim"):
+                job.claimed = claims.claim(job.path, name=priority_filename(job.path, job.priority))
+            if job.claimed is None:
+                logger.info(f"⏭️ Файл уже забран другим узлом: {filename}")
+                return
+        elif claims.lost(job.claimed):
+            logger.warning(f"⚠️ Аренда потеряна, файл обрабатывает другой узел: {filename}")
+            return
+
+        if job.mpn_list is None:
+            with job_context(phase="read"):
+                job.mpn_list = read_mpn_list(job.claimed)
+            # Один клиент (и один токен) на все срезы файла
+            job.nexar = create_client()
+            logger.info(
+                f"🔄 Начало обработки: {filename} ({len(job.mpn_list)} строк, приоритет {job.priority})"
+            )
+
+        with job_context(phase="nexar"):
+            requests, parts = process_rows(job.next_slice(slice_rows), job.nexar)
+        job.requests.update(requests)
+        job.parts.update(parts)
+
+        if not job.done:
+            # Остаток возвращаем в очередь, чтобы пропустить вперёд маленькие файлы
+            logger.info(f"⏸️ {filename}: обработано {job.offset}/{len(job.mpn_list)} строк")
+            scheduler.requeue(job, slice_rows)
+            return
+
+        # Пока шёл последний срез, файл могли забрать по истечении аренды — не дублируем отправку
+        if claims.lost(job.claimed):
+            logger.warning(f"⚠️ Аренда потеряна, отправка в 1С пропущена: {filename}")
+            return
+
+        with job_context(phase="1c"):
+            send_octopart_to_1c(build_output(job.requests, job.parts))
+        logger.info(f"✅ Успешно обработан: {filename}")
+        claims.release(job.claimed)
+
+    except Exception as e:
+        logger.error(f"💥 Ошибка обработки {job.path}: {e}")
+        if job.claimed:
+            claims.release(job.claimed, success=False)
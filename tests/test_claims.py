@@ -0,0 +1,105 @@
+import os
+import time
+import multiprocessing
+
+from pipeline.claims import FileClaims
+
+
+def _claim_all(args):
+    root, watch, node_id = args
+    node = FileClaims(root, node_id=node_id)
+    node.start()
+    won = []
+    for name in sorted(os.listdir(watch)):
+        path = os.path.join(watch, name)
+        if os.path.isfile(path) and node.claim(path):
+            won.append(name)
+    return won
+
+
+def _expire(node):
+    old = time.time() - node.lease_ttl - 10
+    os.utime(node.heartbeat_path, (old, old))
+
+
+def test_each_file_has_one_winner(tmp_path):
+    watch = tmp_path / "watch"
+    watch.mkdir()
+    for i in range(40):
+        (watch / f"bom{i}.xlsx").write_bytes(b"x")
+    root = str(tmp_path / "claims")
+
+    with multiprocessing.Pool(4) as pool:
+        results = pool.map(_claim_all, [(root, str(watch), f"node{i}") for i in range(4)])
+
+    won = [name for names in results for name in names]
+    assert sorted(won) == sorted(f"bom{i}.xlsx" for i in range(40))
+
+
+def test_takeover_after_lease_expires(tmp_path):
+    root = str(tmp_path / "claims")
+    a = FileClaims(root, node_id="a", lease_ttl=1)
+    b = FileClaims(root, node_id="b", lease_ttl=1)
+    a.start()
+    b.start()
+    src = tmp_path / "bom.xlsx"
+    src.write_bytes(b"x")
+
+    claimed = a.claim(str(src))
+    assert b.reclaim_expired() == []
+
+    _expire(a)
+    taken = b.reclaim_expired()
+    assert [os.path.basename(p) for p in taken] == ["bom.xlsx"]
+    assert b.owns(taken[0])
+    assert a.lost(claimed)
+
+
+def test_node_recovers_after_losing_lease(tmp_path):
+    root = str(tmp_path / "claims")
+    a = FileClaims(root, node_id="a", lease_ttl=1)
+    b = FileClaims(root, node_id="b", lease_ttl=1)
+    a.start()
+    b.start()
+    (tmp_path / "first.xlsx").write_bytes(b"x")
+    a.claim(str(tmp_path / "first.xlsx"))
+
+    _expire(a)
+    b.reclaim_expired()
+
+    # Медленный узел продолжает продлевать аренду и захватывать новые файлы
+    a.heartbeat()
+    assert b.reclaim_expired() == []
+    (tmp_path / "second.xlsx").write_bytes(b"x")
+    claimed = a.claim(str(tmp_path / "second.xlsx"))
+    assert claimed is not None and a.owns(claimed)
+
+
+def test_claim_of_missing_file_returns_none(tmp_path):
+    node = FileClaims(str(tmp_path / "claims"), node_id="a")
+    node.start()
+    assert node.claim(str(tmp_path / "gone.xlsx")) is None
+
+
+def test_empty_expired_node_folder_is_removed(tmp_path):
+    root = str(tmp_path / "claims")
+    a = FileClaims(root, node_id="a", lease_ttl=1)
+    b = FileClaims(root, node_id="b", lease_ttl=1)
+    a.start()
+    b.start()
+
+    _expire(a)
+    b.reclaim_expired()
+
+    assert sorted(os.listdir(b.nodes_dir)) == ["b"]
+
+
+def test_default_node_id_survives_restart(tmp_path):
+    root = str(tmp_path / "claims")
+    first = FileClaims(root)
+    first.start()
+    (tmp_path / "bom.xlsx").write_bytes(b"x")
+    claimed = first.claim(str(tmp_path / "bom.xlsx"))
+
+    restarted = FileClaims(root)
+    assert restarted.recover() == [claimed]
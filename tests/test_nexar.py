@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+import pytest
+
+from pipeline.logs import JobContextFilter, job_context
+from pipeline.nexar import build_output, match_all_mpn, process_all_mpn
+
+
+class FakeNexar:
+    """Каждый MPN находит себя и общий вариант SHARED"""
+
+    def __init__(self):
+        self.queries = 0
+
+    def get_query(self, query, variables):
+        self.queries += 1
+        if "supSearch" in query:
+            return {"supSearch": {"results": [
+                {"part": {"mpn": variables["q"]}}, {"part": {"mpn": "SHARED"}}
+            ]}}
+        return {"supMultiMatch": [{"parts": [
+            {
+                "mpn": q["mpn"],
+                "category": {},
+                "sellers": [{
+                    "company": {"name": "Mouser"},
+                    "offers": [{"inventoryLevel": 1, "prices": [{"quantity": 1, "convertedPrice": 1.0}]}],
+                }],
+            }
+            for q in variables["queries"]
+        ]}]}
+
+
+@pytest.fixture(autouse=True)
+def no_warm_store(monkeypatch):
+    monkeypatch.setenv("WARM_STORE", "")
+
+
+def test_variants_are_off_by_default(monkeypatch):
+    monkeypatch.delenv("NEXAR_MAX_VARIANTS", raising=False)
+    nexar = FakeNexar()
+
+    rows = asyncio.run(process_all_mpn([{"mpn": "A", "quantity": 1}], nexar=nexar))
+
+    # Только supMultiMatch по самому MPN, без supSearch и вариаций
+    assert nexar.queries == 1
+    assert [row["mpn"] for row in rows] == ["A"]
+
+
+def test_slices_merge_like_single_run(monkeypatch):
+    monkeypatch.setenv("NEXAR_MAX_VARIANTS", "5")
+    mpn_list = [{"mpn": m, "quantity": 1} for m in ("A", "B", "A", "C")]
+
+    whole = asyncio.run(process_all_mpn(mpn_list, nexar=FakeNexar()))
+
+    nexar = FakeNexar()
+    requests, parts = {}, {}
+    for i in range(0, len(mpn_list), 2):
+        r, p = asyncio.run(match_all_mpn(mpn_list[i:i + 2], nexar))
+        requests.update(r)
+        parts.update(p)
+    sliced = build_output(requests, parts)
+
+    assert sliced == whole
+    assert [row["mpn"] for row in sliced] == ["A", "SHARED", "B", "C"]
+
+
+def test_job_context_reaches_nexar_threads():
+    seen = []
+
+    class ContextNexar(FakeNexar):
+        def get_query(self, query, variables):
+            record = logging.LogRecord("pipeline.nexar", logging.INFO, __file__, 0, "", None, None)
+            JobContextFilter().filter(record)
+            seen.append((record.job_id, record.phase))
+            return super().get_query(query, variables)
+
+    with job_context(job_id="ab12", phase="nexar"):
+        asyncio.run(match_all_mpn([{"mpn": "A", "quantity": 1}], ContextNexar()))
+
+    assert seen and set(seen) == {("ab12", "nexar")}
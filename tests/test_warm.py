@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from pipeline import prewarm as prewarm_module
+from pipeline.warm import WarmStore
+
+
+class CountingNexar:
+    def __init__(self):
+        self.queries = 0
+
+    def get_query(self, query, variables):
+        self.queries += 1
+        if "supSearch" in query:
+            return {"supSearch": {"results": [{"part": {"mpn": variables["q"]}}]}}
+        return {"supMultiMatch": [{"parts": [{"mpn": q["mpn"]} for q in variables["queries"]]}]}
+
+
+def test_prewarm_refreshes_entries_expiring_during_the_day(tmp_path, monkeypatch):
+    store = WarmStore(str(tmp_path / "warm.db"), ttl_hours=24)
+    store.record_requests(["A"])
+    store.put_variants("A", ["A"])
+    store.put_parts(["A"], [{"mpn": "A"}])
+    # Вчерашний прогрев: запись ещё свежая, но истечёт через несколько минут
+    yesterday = time.time() - 24 * 3600 + 300
+    store.conn.execute("UPDATE variants SET fetched_at = ?", (yesterday,))
+    store.conn.execute("UPDATE parts SET fetched_at = ?", (yesterday,))
+    store.conn.commit()
+    assert store.get_variants("A") == ["A"]
+
+    monkeypatch.setenv("NEXAR_MAX_VARIANTS", "5")
+    nexar = CountingNexar()
+    monkeypatch.setattr(prewarm_module, "create_client", lambda: nexar)
+    asyncio.run(prewarm_module.prewarm_async(store, budget=10))
+
+    assert nexar.queries == 2
+    assert store.get_variants("A", fresh_for=20 * 3600) == ["A"]
+    assert store.get_parts(["A"], fresh_for=20 * 3600) == {"A": {"mpn": "A"}}
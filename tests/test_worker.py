@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from pipeline import worker
+from pipeline.claims import FileClaims
+from pipeline.scheduler import Job, JobScheduler
+
+from tests.test_nexar import FakeNexar
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("WARM_STORE", "")
+    monkeypatch.setenv("NEXAR_MAX_VARIANTS", "5")
+    sent = []
+    nexar = FakeNexar()
+    rows = [{"mpn": m, "quantity": 1} for m in ("A", "B", "C")]
+    monkeypatch.setattr(worker, "read_mpn_list", lambda path: list(rows))
+    monkeypatch.setattr(worker, "create_client", lambda: nexar)
+    monkeypatch.setattr(worker, "send_octopart_to_1c", sent.append)
+
+    claims = FileClaims(str(tmp_path / "claims"), node_id="a")
+    claims.start()
+    src = tmp_path / "bom.xlsx"
+    src.write_bytes(b"x")
+    return claims, str(src), sent, nexar
+
+
+def _run(job, claims, scheduler, slice_rows):
+    worker.process_job(job, claims, scheduler, slice_rows)
+    while (queued := scheduler.get()) is not None:
+        worker.process_job(queued, claims, scheduler, slice_rows)
+
+
+@pytest.mark.parametrize("slice_rows", [500, 1])
+def test_process_job_end_to_end(env, slice_rows):
+    claims, src, sent, nexar = env
+    scheduler = JobScheduler()
+    scheduler.close()
+
+    _run(Job(src), claims, scheduler, slice_rows)
+
+    assert len(sent) == 1
+    assert [row["requested_mpn"] for row in sent[0]] == ["A", "A", "B", "C"]
+    assert nexar.queries > 0
+    assert os.listdir(claims.done_dir) == ["bom.xlsx"]
+    assert os.listdir(claims.failed_dir) == []
+
+
+def test_process_job_skips_send_when_lease_lost(env):
+    claims, src, sent, nexar = env
+    scheduler = JobScheduler()
+    job = Job(src)
+
+    worker.process_job(job, claims, scheduler, 1)
+    os.remove(job.claimed)  # файл забрал другой узел
+    scheduler.close()
+    _run(scheduler.get(), claims, scheduler, 1)
+
+    assert sent == []
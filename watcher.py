@@ -2,29 +2,53 @@ import os
 import time
 import logging
 import threading
-from queue import Queue
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from app import process_file  # Импортируй свою функцию обработки
+from dotenv import load_dotenv
+
+# .env загружаем до импорта pipeline: его модули читают настройки из окружения
+load_dotenv()
+
+from pipeline.claims import FileClaims  # Ядро без Flask; pandas/zeep грузятся лениво
+from pipeline.scheduler import Job, JobScheduler
+from pipeline.worker import process_job
+from pipeline.logs import setup_logging, job_context
+from pipeline.prewarm import prewarm_loop
 
 # Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        #logging.FileHandler('/var/log/file-watcher.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging(level=logging.INFO, logfile=os.getenv("WATCHER_LOG_FILE"))  # например /var/log/file-watcher.log
 
 WATCH_FOLDER = ""
-file_queue = Queue()
 
 if os.name == "nt":
     WATCH_FOLDER = "D:/dev/ftp_watcher/watch"
 else:
     WATCH_FOLDER = "/home/test_project/ftp_uploads"
 
+# Файлы из этой подпапки (или с urgent/срочно/__urgent в имени) обрабатываются вне очереди
+URGENT_FOLDER = os.path.join(WATCH_FOLDER, "urgent")
+# Файлы из этой подпапки (или с __low в конце имени) уступают обычным
+LOW_FOLDER = os.path.join(WATCH_FOLDER, "low")
+
+# Большие BOM обрабатываются срезами, чередуясь с маленькими
+SLICE_ROWS = int(os.getenv("SLICE_ROWS", 500))
+# На сколько строк «дешевеет» ожидающий файл за секунду
+AGING_RATE = float(os.getenv("SCHED_AGING_RATE", 20))
+
+file_queue = JobScheduler(aging_rate=AGING_RATE)
+
+# Ночной прогрев кеша Nexar. Кеш WARM_STORE — локальный SQLite-файл хоста: процессы
+# одного хоста делят его, если WARM_STORE указывает на один и тот же файл, поэтому
+# прогрев включают на одном процессе каждого хоста. Класть файл на сетевую папку нельзя.
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED") == "1"
+
+# Общая папка захватов для нескольких узлов; должна быть на той же ФС, что и WATCH_FOLDER
+CLAIMS_FOLDER = os.getenv("CLAIMS_FOLDER") or os.path.join(WATCH_FOLDER, ".claims")
+LEASE_TTL = int(os.getenv("LEASE_TTL", 120))
+
+# По умолчанию узел — имя хоста; для нескольких процессов на одном хосте задайте разные WATCHER_NODE_ID
+claims = FileClaims(CLAIMS_FOLDER, node_id=os.getenv("WATCHER_NODE_ID"), lease_ttl=LEASE_TTL)
+
 def wait_until_file_is_ready(filepath, timeout=60, check_interval=5):
     """Ожидает, пока файл не перестанет изменяться"""
     last_size = -1
@@ -34,6 +58,10 @@ def wait_until_file_is_ready(filepath, timeout=60, check_interval=5):
     for attempt in range(timeout):
         try:
             if not os.path.exists(filepath):
+                if last_size != -1:
+                    # Файл уже видели — его захватил другой узел
+                    logging.info(f"⏭️ Файл {filepath} забран другим узлом")
+                    return False
                 logging.warning(f"Файл {filepath} не найден, ожидание...")
                 time.sleep(check_interval)
                 continue
@@ -70,47 +98,49 @@ class UploadHandler(FileSystemEventHandler):
             
             if wait_until_file_is_ready(event.src_path):
                 logging.info(f"✅ Файл {filename} готов к обработке")
-                file_queue.put(os.path.normpath(event.src_path))
-            else:
+                file_queue.put(Job.from_file(os.path.normpath(event.src_path)))
+            elif os.path.exists(event.src_path):
                 logging.error(f"❌ Файл {filename} не готов к обработке")
 
 def worker():
     """Рабочий поток для обработки файлов"""
     logging.info("👷 Worker thread started")
     while True:
-        filepath = file_queue.get()
-        if filepath is None:
+        job = file_queue.get()
+        if job is None:
             break
-            
-        try:
-            if os.path.exists(filepath):
-                logging.info(f"🔄 Начало обработки: {os.path.basename(filepath)}")
-                process_file(filepath)
-                logging.info(f"✅ Успешно обработан: {os.path.basename(filepath)}")
-            else:
-                logging.error(f"❌ Файл не найден: {filepath}")
-                
-        except Exception as e:
-            logging.error(f"💥 Ошибка обработки {filepath}: {e}")
-        finally:
-            file_queue.task_done()
+
+        with job_context(job_id=job.id, job_file=os.path.basename(job.path)):
+            process_job(job, claims, file_queue, SLICE_ROWS)
 
 def main():
     """Основная функция запуска watcher"""
     # Создаем папку для наблюдения если её нет
     os.makedirs(WATCH_FOLDER, exist_ok=True)
+    os.makedirs(URGENT_FOLDER, exist_ok=True)
+    os.makedirs(LOW_FOLDER, exist_ok=True)
     
     logging.info(f"🚀 Запуск File Watcher для папки: {WATCH_FOLDER}")
+    claims.start()
+    for filepath in claims.recover():
+        file_queue.put(Job.from_file(filepath))
     logging.info(f"📊 Размер очереди: {file_queue.qsize()}")
     
     # Запускаем рабочий поток
     worker_thread = threading.Thread(target=worker, daemon=True)
     worker_thread.start()
+
+    prewarm_stop = threading.Event()
+    if PREWARM_ENABLED:
+        threading.Thread(target=prewarm_loop, args=(prewarm_stop,), daemon=True).start()
+        logging.info("🔥 Ночной прогрев кеша включён")
     
     # Настраиваем наблюдатель
     observer = Observer()
     event_handler = UploadHandler()
     observer.schedule(event_handler, WATCH_FOLDER, recursive=False)
+    observer.schedule(event_handler, URGENT_FOLDER, recursive=False)
+    observer.schedule(event_handler, LOW_FOLDER, recursive=False)
     
     try:
         observer.start()
@@ -119,7 +149,9 @@ def main():
         # Бесконечный цикл для поддержания работы
         while True:
             time.sleep(60)  # Проверяем каждую минуту
-            # Можно добавить периодические проверки состояния здесь
+            # Забираем файлы узлов, не продливших аренду
+            for filepath in claims.reclaim_expired():
+                file_queue.put(Job.from_file(filepath))
             
     except KeyboardInterrupt:
         logging.info("🛑 Получен сигнал остановки...")
@@ -129,8 +161,10 @@ def main():
         logging.info("🧹 Завершение работы...")
         observer.stop()
         observer.join()
-        file_queue.put(None)  # Сигнал остановки worker'у
+        file_queue.close()  # Сигнал остановки worker'у
         worker_thread.join(timeout=10)
+        claims.stop()
+        prewarm_stop.set()
 
 if __name__ == "__main__":
     main()